@@ -0,0 +1,88 @@
+"""Аутентификация по токену с кэшем пользователей в памяти процесса"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """LRU токен -> (снимок пользователя, токен) с ограниченным временем жизни.
+
+    Записи сбрасываются сигналами при выходе и изменении пользователя;
+    TTL ограничивает время, за которое изменения, сделанные в других
+    воркерах, дойдут до этого процесса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() > entry[0]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_TTL, value
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key, (_, (snapshot, _)) in list(self._entries.items()):
+                if snapshot.pk == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UserSnapshot:
+    """Значения полей пользователя, из которых собирается новый объект"""
+
+    def __init__(self, user):
+        self.model = type(user)
+        self.pk = user.pk
+        self.db = user._state.db
+        self.field_names = [
+            field.attname for field in self.model._meta.concrete_fields
+        ]
+        self.values = [getattr(user, name) for name in self.field_names]
+
+    def restore(self):
+        return self.model.from_db(self.db, self.field_names, self.values)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД для недавно виденных токенов"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (UserSnapshot(user), token))
+            return user, token
+        snapshot, token = cached
+        # Каждый запрос получает свой объект, чтобы изменения request.user
+        # не попадали в кэш и в соседние потоки
+        return snapshot.restore(), token
@@ -0,0 +1,100 @@
+"""Пакетное создание рецептов по правилам AddRecipeSerializer"""
+from django.db import transaction
+
+from .cache import invalidate_on_commit
+from .serializers import AddRecipeSerializer
+from core.counters import increment
+from core.images import schedule_renditions
+from core.models import Ingredient, IngredientRecipe, Recipe, Tag
+from core.search import schedule_search_update
+from users.models import User
+
+
+def collect_ids(items, key):
+    """id из сырых данных, чтобы заранее загрузить их одним запросом"""
+    ids = set()
+    for item in items:
+        values = item.get(key) if isinstance(item, dict) else None
+        if not isinstance(values, list):
+            continue
+        for value in values:
+            if isinstance(value, dict):
+                value = value.get('id')
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                continue
+    return ids
+
+
+def validate_recipes(items, author, context=None):
+    """Возвращает провалидированные данные и ошибки по номерам записей"""
+    context = dict(context or {})
+    context['ingredients'] = Ingredient.objects.in_bulk(
+        collect_ids(items, 'ingredients')
+    )
+    context['tags'] = Tag.objects.in_bulk(collect_ids(items, 'tags'))
+    names = [item.get('name') for item in items if isinstance(item, dict)]
+    taken = set(Recipe.objects.filter(
+        author=author, name__in=names
+    ).values_list('name', flat=True))
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        serializer = AddRecipeSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+        name = serializer.validated_data['name']
+        if name in taken:
+            errors[index] = {'name': ['Рецепт с таким названием уже есть']}
+            continue
+        taken.add(name)
+        valid[index] = serializer.validated_data
+    return valid, errors
+
+
+@transaction.atomic
+def create_recipes(items, author, context=None):
+    """Создаёт рецепты из items несколькими bulk_create.
+
+    Возвращает словари {номер записи: рецепт} и {номер записи: ошибки}.
+    """
+    valid, errors = validate_recipes(items, author, context)
+    if not valid:
+        return {}, errors
+    recipes = {}
+    for index, data in valid.items():
+        data = dict(data)
+        data.pop('ingredients')
+        data.pop('tags')
+        recipes[index] = Recipe(author=author, **data)
+    Recipe.objects.bulk_create(recipes.values())
+    if any(recipe.pk is None for recipe in recipes.values()):
+        # Не все СУБД возвращают id после bulk_create
+        ids = dict(Recipe.objects.filter(
+            author=author, name__in=[r.name for r in recipes.values()]
+        ).values_list('name', 'pk'))
+        for recipe in recipes.values():
+            recipe.pk = ids[recipe.name]
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=recipes[index],
+            ingredient_id=ingredient['id'],
+            amount=ingredient['amount'],
+        )
+        for index, data in valid.items()
+        for ingredient in data['ingredients']
+    )
+    tag_through = Recipe.tags.through
+    tag_through.objects.bulk_create(
+        tag_through(recipe_id=recipes[index].pk, tag_id=tag.pk)
+        for index, data in valid.items()
+        for tag in data['tags']
+    )
+    increment(User.objects.filter(pk=author.pk), 'recipes_count',
+              len(recipes))
+    invalidate_on_commit()
+    schedule_search_update(recipe.pk for recipe in recipes.values())
+    for recipe in recipes.values():
+        schedule_renditions(recipe)
+    return recipes, errors
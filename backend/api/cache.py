@@ -0,0 +1,93 @@
+"""Кэш ответов API для анонимных пользователей"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+GENERATION_KEY = 'api:generation'
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def count(event):
+    with _lock:
+        _stats[event] += 1
+
+
+def stats():
+    """Счётчики попаданий и промахов текущего процесса"""
+    with _lock:
+        return dict(_stats)
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def invalidate():
+    """Сбрасывает все закэшированные ответы сменой поколения ключей"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+    count('invalidations')
+
+
+def invalidate_on_commit():
+    """invalidate после фиксации текущей транзакции, один раз на неё.
+
+    Сброс до фиксации позволил бы параллельному запросу закэшировать
+    старые данные уже под новым поколением.
+    """
+    connection = transaction.get_connection()
+    if any(func is invalidate for _, func in connection.run_on_commit):
+        return
+    transaction.on_commit(invalidate)
+
+
+def make_key(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    raw = f'{request.path}?{params}'.encode()
+    digest = hashlib.md5(raw).hexdigest()
+    return f'api:response:{get_generation()}:{digest}'
+
+
+class AnonymousCacheMixin:
+    """Кэширует list и retrieve для неавторизованных запросов"""
+
+    def cached(self, view, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return view(request, *args, **kwargs)
+        key = make_key(request)
+        data = cache.get(key)
+        if data is not None:
+            count('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        count('misses')
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
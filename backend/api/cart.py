@@ -0,0 +1,53 @@
+"""Пакетные операции со списком покупок"""
+from django.db import transaction
+
+from core.counters import increment
+from core.db import delete_returning, insert_ignore_select
+from core.models import Favorite, Recipe, ShoppingCart
+
+
+def change_carts(recipe_ids, delta):
+    """Сдвигает in_carts_count затронутых рецептов одним UPDATE.
+
+    Приращение через F(), а не пересчёт COUNT(*): параллельные
+    транзакции с тем же рецептом не затирают изменения друг друга.
+    """
+    if recipe_ids:
+        increment(
+            Recipe.objects.filter(pk__in=recipe_ids), 'in_carts_count', delta
+        )
+
+
+@transaction.atomic
+def add_to_cart(user, recipe_ids):
+    """Добавляет существующие рецепты из recipe_ids, возвращает их число"""
+    added = insert_ignore_select(
+        ShoppingCart, 'recipe',
+        Recipe.objects.filter(pk__in=recipe_ids).values('pk'),
+        user=user,
+    )
+    change_carts(added, 1)
+    return len(added)
+
+
+@transaction.atomic
+def add_favorites_to_cart(user):
+    """Копирует избранное пользователя в список покупок"""
+    added = insert_ignore_select(
+        ShoppingCart, 'recipe',
+        Favorite.objects.filter(user=user).values('recipe'),
+        user=user,
+    )
+    change_carts(added, 1)
+    return len(added)
+
+
+@transaction.atomic
+def remove_from_cart(user, recipe_ids=None):
+    """Убирает рецепты из списка покупок, без recipe_ids - очищает его"""
+    carts = ShoppingCart.objects.filter(user=user)
+    if recipe_ids is not None:
+        carts = carts.filter(recipe_id__in=recipe_ids)
+    removed = delete_returning(carts, 'recipe')
+    change_carts(removed, -1)
+    return len(removed)
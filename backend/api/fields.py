@@ -1,14 +1,47 @@
 import base64
+import binascii
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
 from rest_framework import serializers
 
+from .metrics import registry
+from core.images import rendition_urls
+
 
 class Base64ImageField(serializers.ImageField):
     """Сериализатор для конвертации изображения"""
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            format, _, imgstr = data.partition(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            # Base64 из MIME-сообщений разбит на строки
+            imgstr = ''.join(imgstr.split())
+            max_size = settings.MAX_IMAGE_UPLOAD_SIZE
+            if len(imgstr) // 4 * 3 > max_size:
+                raise serializers.ValidationError(
+                    f'Размер изображения больше {max_size} байт'
+                )
+            try:
+                content = base64.b64decode(imgstr)
+            except (binascii.Error, ValueError):
+                raise serializers.ValidationError(
+                    'Изображение должно быть в кодировке base64'
+                )
+            registry.observe('foodgram_image_upload_bytes', len(content))
+            data = File(BytesIO(content), name='temp.' + ext)
         return super().to_internal_value(data)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения рецепта (source='*')"""
+    def to_representation(self, recipe):
+        urls = rendition_urls(recipe)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {
+                rendition: request.build_absolute_uri(url)
+                for rendition, url in urls.items()
+            }
+        return urls
@@ -1,6 +1,7 @@
 from django_filters.rest_framework import FilterSet, filters
 
 from core.models import Recipe, Tag
+from core.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -16,6 +17,21 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Популярные сейчас'),
+            ('cooking_time', 'Время приготовления'),
+        ),
+        method='filter_ordering'
+    )
+
+    ORDERINGS = {
+        'popular': ('-favorites_count', '-pub_date'),
+        'trending': ('-trending_score', '-pub_date'),
+        'cooking_time': ('cooking_time', '-pub_date'),
+    }
 
     class Meta:
         model = Recipe
@@ -24,11 +40,17 @@ class RecipeFilter(FilterSet):
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping_cart__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
@@ -0,0 +1,189 @@
+import json
+import math
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from core.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+# Имя сценария: (путь, параметры, запрос от анонимного пользователя)
+SCENARIOS = {
+    'recipes_list_10': ('/api/recipes/', {'limit': 10}, False),
+    'recipes_list_50': ('/api/recipes/', {'limit': 50}, False),
+    'recipes_list_200': ('/api/recipes/', {'limit': 200}, False),
+    'recipes_list_tags': (
+        '/api/recipes/', {'limit': 10, 'tags': 'breakfast'}, False
+    ),
+    'recipes_list_favorited': (
+        '/api/recipes/', {'limit': 10, 'is_favorited': 1}, False
+    ),
+    'recipes_list_popular': (
+        '/api/recipes/', {'limit': 10, 'ordering': 'popular'}, False
+    ),
+    'recipes_search': (
+        '/api/recipes/', {'limit': 10, 'search': 'рецепт'}, False
+    ),
+    'recipes_list_anonymous_cached': ('/api/recipes/', {}, True),
+    'recipes_feed': ('/api/recipes/feed/', {'limit': 10}, False),
+    'recipe_detail': ('/api/recipes/{recipe}/', {}, False),
+    'subscriptions': (
+        '/api/users/subscriptions/', {'recipes_limit': 3}, False
+    ),
+    'download_shopping_cart_pdf': (
+        '/api/recipes/download_shopping_cart/', {'type': 'pdf'}, False
+    ),
+    'download_shopping_cart_txt': (
+        '/api/recipes/download_shopping_cart/', {'type': 'txt'}, False
+    ),
+    'ingredients_search': ('/api/ingredients/', {'name': 'мол'}, False),
+}
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * share) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Команда для замера времени ответа и числа SQL-запросов '
+            'основных эндпоинтов; результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Сколько первых запросов каждого сценария не учитывать'
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя, от имени которого идут '
+                           'запросы; по умолчанию - с наибольшим числом '
+                           'подписок'
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument(
+            '--close-connections', action='store_true',
+            help='Закрывать соединение с БД после каждого запроса, '
+                 'как при CONN_MAX_AGE = 0'
+        )
+        parser.add_argument('--output', help='Файл для результата')
+        parser.add_argument(
+            '--compare', help='Результат прошлого запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        recipe = Recipe.objects.order_by('-pub_date', '-id').first()
+        if recipe is None:
+            raise CommandError('В базе нет рецептов, запустите seed_synthetic')
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_HOST='localhost')
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            path, params, anonymous = SCENARIOS[name]
+            path = path.format(recipe=recipe.pk)
+            results[name] = self.run(
+                client, path, params, {} if anonymous else headers,
+                options['iterations'], options['warmup'],
+                options['close_connections']
+            )
+            self.stderr.write(
+                f'{name}: p95 {results[name]["p95_ms"]} мс, '
+                f'{results[name]["rps"]} запросов/с, '
+                f'{results[name]["queries"]} SQL-запросов'
+            )
+        report = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'vendor': connection.vendor,
+                'iterations': options['iterations'],
+                'close_connections': options['close_connections'],
+                'user': user.email,
+                'following': user.following,
+                'rows': {
+                    'users': User.objects.count(),
+                    'recipes': Recipe.objects.count(),
+                    'subscriptions': Subscribe.objects.count(),
+                    'favorites': Favorite.objects.count(),
+                    'shopping_cart': ShoppingCart.objects.count(),
+                },
+            },
+            'scenarios': results,
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_user(self, email):
+        users = User.objects.annotate(following=Count('subscriber'))
+        if email:
+            user = users.filter(email=email).first()
+        else:
+            user = users.order_by('-following', 'pk').first()
+        if user is None:
+            raise CommandError('Пользователь для замеров не найден')
+        return user
+
+    def run(self, client, path, params, headers, iterations, warmup,
+            close_connections):
+        timings, queries, statuses = [], [], set()
+        for number in range(warmup + iterations):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = client.get(path, params, **headers)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                if close_connections:
+                    # Тестовый клиент не закрывает соединения сам
+                    connection.close()
+                elapsed = (time.perf_counter() - started) * 1000
+            if number < warmup:
+                continue
+            timings.append(elapsed)
+            queries.append(len(context.captured_queries))
+            statuses.add(response.status_code)
+        return {
+            'path': path,
+            'params': params,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'rps': round(len(timings) / sum(timings) * 1000, 1),
+            'max_ms': round(max(timings), 2),
+            'queries': statistics.median_low(queries),
+            'queries_max': max(queries),
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = result['p95_ms'] / before['p95_ms'] - 1
+            self.stderr.write(
+                f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} мс '
+                f'({change:+.0%}), запросов/с {before.get("rps")} -> '
+                f'{result["rps"]}, SQL-запросов {before["queries"]} -> '
+                f'{result["queries"]}'
+            )
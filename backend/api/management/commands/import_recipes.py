@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from api.bulk import create_recipes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Команда для пакетной загрузки рецептов из файла JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл, по одному рецепту в строке')
+        parser.add_argument(
+            '--author', required=True, help='Email автора рецептов'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько рецептов создавать в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(email=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["author"]} не найден')
+        started = time.monotonic()
+        created = failed = 0
+        batch, lines = [], []
+        with open(options['path'], encoding='utf-8') as file:
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError as error:
+                    self.stderr.write(f'Строка {number}: {error}')
+                    failed += 1
+                    continue
+                lines.append(number)
+                if len(batch) >= options['batch_size']:
+                    ok, bad = self.load(batch, lines, author)
+                    created, failed = created + ok, failed + bad
+                    batch, lines = [], []
+        if batch:
+            ok, bad = self.load(batch, lines, author)
+            created, failed = created + ok, failed + bad
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {created}, с ошибками: {failed} '
+            f'за {elapsed:.2f} с.'
+        ))
+
+    def load(self, batch, lines, author):
+        recipes, errors = create_recipes(batch, author)
+        for index, error in errors.items():
+            self.stderr.write(f'Строка {lines[index]}: {error}')
+        return len(recipes), len(errors)
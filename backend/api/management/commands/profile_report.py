@@ -0,0 +1,89 @@
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+SORT_KEYS = ('sql_ms', 'queries', 'wall_ms', 'requests', 'slow')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = 'Команда для сводки по логу профилирования SQL по видам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.SQL_PROFILING_LOG,
+            help='Лог, который пишет api.profiling.SQLProfilingMiddleware'
+        )
+        parser.add_argument(
+            '--top', type=int, default=10, help='Сколько видов показать'
+        )
+        parser.add_argument(
+            '--sort', choices=SORT_KEYS, default='sql_ms',
+            help='Сортировка: по суммарному времени SQL, среднему числу '
+                 'запросов, среднему времени ответа, числу запросов '
+                 'или медленных запросов'
+        )
+
+    def handle(self, *args, **options):
+        views = defaultdict(list)
+        try:
+            with open(options['file'], encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    views[record.get('view') or record['path']].append(record)
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать лог: {error}')
+        if not views:
+            self.stdout.write('В логе нет записей.')
+            return
+        rows = [self.summarize(view, records)
+                for view, records in views.items()]
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+        for row in rows[:options['top']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(row['view']))
+            self.stdout.write(
+                f'  запросов: {row["requests"]}, медленных: {row["slow"]}; '
+                f'SQL: в среднем {row["queries"]:.1f} запросов, '
+                f'p95 {row["queries_p95"]}, максимум {row["queries_max"]}; '
+                f'время SQL {row["sql_ms"]:.0f} мс всего, '
+                f'p95 {row["sql_ms_p95"]:.1f} мс; '
+                f'ответ в среднем {row["wall_ms"]:.1f} мс'
+            )
+            for key, (count, sql) in row['duplicates']:
+                self.stdout.write(
+                    f'  повтор {key}: {count:.1f} раз за запрос: {sql[:120]}'
+                )
+
+    def summarize(self, view, records):
+        total = len(records)
+        queries = [record['queries'] for record in records]
+        sql_ms = [record['sql_ms'] for record in records]
+        repeats, samples = Counter(), {}
+        for record in records:
+            for duplicate in record.get('duplicates', []):
+                repeats[duplicate['fingerprint']] += duplicate['count']
+                samples[duplicate['fingerprint']] = duplicate['sql']
+        return {
+            'view': view,
+            'requests': total,
+            'slow': sum(1 for record in records if record.get('slow')),
+            'queries': sum(queries) / total,
+            'queries_p95': percentile(queries, 0.95),
+            'queries_max': max(queries),
+            'sql_ms': sum(sql_ms),
+            'sql_ms_p95': percentile(sql_ms, 0.95),
+            'wall_ms': sum(record['wall_ms'] for record in records) / total,
+            'duplicates': [
+                (key, (count / total, samples[key]))
+                for key, count in repeats.most_common(3)
+            ],
+        }
@@ -0,0 +1,319 @@
+"""Метрики в формате Prometheus, общие для всех воркеров gunicorn.
+
+Включаются настройкой METRICS_ENABLED. Каждый процесс копит счётчики
+в памяти и раз в METRICS_FLUSH_INTERVAL секунд атомарно перезаписывает
+свой файл <pid>-<случайная строка>.json в METRICS_DIR: даже повторно
+выданный pid не перезапишет файл другого процесса. Файл пишет только его
+процесс, поэтому блокировки между воркерами не нужны. /api/metrics/
+суммирует все файлы, а файлы завершившихся процессов под блокировкой
+переносит в archive.json, чтобы счётчики не уменьшались и каталог
+не рос.
+"""
+import atexit
+import fcntl
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import stats as cache_stats
+from .profiling import view_name
+from core.connections import stats as connection_stats
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+ARCHIVE = 'archive.json'
+ARCHIVE_LOCK = 'archive.lock'
+SIZE_BUCKETS = tuple(
+    kb * 1024 for kb in (16, 64, 256, 1024, 2048, 5120, 10240)
+)
+
+METRICS = {
+    'foodgram_http_request_duration_seconds': (
+        'histogram', 'Время ответа по видам', LATENCY_BUCKETS
+    ),
+    'foodgram_http_requests_total': (
+        'counter', 'Число ответов по видам и кодам', None
+    ),
+    'foodgram_db_queries_per_request': (
+        'histogram', 'Число SQL-запросов на запрос', QUERY_BUCKETS
+    ),
+    'foodgram_image_upload_bytes': (
+        'histogram', 'Размер загруженных изображений', SIZE_BUCKETS
+    ),
+    'foodgram_response_cache_total': (
+        'counter', 'События кэша ответов для анонимных пользователей', None
+    ),
+    'foodgram_db_connections_total': (
+        'counter', 'События постоянных соединений с БД', None
+    ),
+    'foodgram_worker_requests_total': (
+        'counter', 'Число запросов, обработанных воркером', None
+    ),
+    'foodgram_worker_last_flush_timestamp_seconds': (
+        'gauge', 'Время последней записи метрик воркером', None
+    ),
+}
+
+
+class Registry:
+    """Метрики текущего процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._flushed = 0.0
+        self._pid = None
+        self._name = None
+
+    @property
+    def name(self):
+        """Имя файла процесса; после fork у воркера появляется своё"""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._name = f'{pid}-{secrets.token_hex(4)}'
+        return self._name
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = METRICS[name][2]
+        key = (name, tuple(labels))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Счётчики по корзинам, последняя - +Inf, затем сумма
+                counts = self._values[key] = [0] * (len(buckets) + 2)
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        pid = str(os.getpid())
+        with self._lock:
+            values = [
+                [name, list(labels), value if not isinstance(value, list)
+                 else list(value)]
+                for (name, labels), value in self._values.items()
+            ]
+        values.extend(
+            ['foodgram_response_cache_total', [['event', event]], total]
+            for event, total in cache_stats().items()
+        )
+        values.extend(
+            ['foodgram_db_connections_total', [['event', event]], total]
+            for event, total in connection_stats().items()
+        )
+        values.append([
+            'foodgram_worker_last_flush_timestamp_seconds',
+            [['pid', pid]], time.time()
+        ])
+        return values
+
+    def flush(self, force=False):
+        """Переписывает файл процесса, если прошло METRICS_FLUSH_INTERVAL"""
+        if not settings.METRICS_ENABLED:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_json(
+            os.path.join(settings.METRICS_DIR, f'{self.name}.json'),
+            self.snapshot()
+        )
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+
+
+def write_json(path, data):
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def read_json(path, default=None):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return default
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def add_values(totals, values):
+    for name, labels, value in values:
+        key = (name, tuple(tuple(label) for label in labels))
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            for position, item in enumerate(value):
+                current[position] += item
+        elif METRICS[name][0] == 'gauge':
+            totals[key] = value
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def fold_dead_workers(directory):
+    """Переносит файлы завершившихся процессов в archive.json.
+
+    Список перенесённых файлов хранится в архиве, поэтому сбой между
+    записью архива и удалением файла не приводит к двойному учёту.
+    Вызывается под блокировкой ARCHIVE_LOCK.
+    """
+    archive_path = os.path.join(directory, ARCHIVE)
+    archive = read_json(archive_path, {'values': [], 'folded': []})
+    folded = set(archive['folded'])
+    dead = []
+    for entry in os.scandir(directory):
+        pid = entry.name[:-len('.json')].split('-', 1)[0]
+        if (entry.name == ARCHIVE or not entry.name.endswith('.json')
+                or entry.name in folded or not pid.isdigit()
+                or is_alive(int(pid))):
+            continue
+        dead.append(entry)
+    if dead:
+        totals = {}
+        add_values(totals, archive['values'])
+        for entry in dead:
+            add_values(totals, [
+                value for value in read_json(entry.path, [])
+                # Время последней записи завершившегося воркера не нужно
+                if METRICS[value[0]][0] != 'gauge'
+            ])
+        archive = {
+            'values': [
+                [name, [list(label) for label in labels], value]
+                for (name, labels), value in totals.items()
+            ],
+            'folded': sorted(folded | {entry.name for entry in dead}),
+        }
+        write_json(archive_path, archive)
+    if archive['folded']:
+        for name in archive['folded']:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        archive['folded'] = []
+        write_json(archive_path, archive)
+    return archive['values']
+
+
+def collect():
+    """Суммирует метрики всех воркеров"""
+    registry.flush(force=True)
+    directory = settings.METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    totals = {}
+    with open(os.path.join(directory, ARCHIVE_LOCK), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        add_values(totals, fold_dead_workers(directory))
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.json') and entry.name != ARCHIVE:
+                add_values(totals, read_json(entry.path, []))
+    return totals
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def render(totals):
+    """Текстовый формат экспозиции Prometheus"""
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        keys = sorted(key for key in totals if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in keys:
+            labels, value = key[1], totals[key]
+            if kind != 'histogram':
+                lines.append(f'{name}{format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                bucket_labels = format_labels(labels + (('le', bound),))
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryCounter:
+    """execute_wrapper, считающий SQL-запросы"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Собирает время ответа и число SQL-запросов по видам"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connections['default'].execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        view = getattr(request, 'metrics_view', None) or 'unresolved'
+        labels = (('view', view), ('method', request.method))
+        registry.observe(
+            'foodgram_http_request_duration_seconds', duration, labels
+        )
+        registry.observe(
+            'foodgram_db_queries_per_request', counter.count, labels
+        )
+        registry.inc(
+            'foodgram_http_requests_total',
+            labels + (('status', str(response.status_code)),)
+        )
+        registry.inc(
+            'foodgram_worker_requests_total', (('pid', str(os.getpid())),)
+        )
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func, request.method)
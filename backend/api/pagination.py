@@ -1,5 +1,191 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def approximate_count(queryset):
+    """Оценка числа строк по плану запроса вместо COUNT(*)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по составному ключу с приблизительным общим
+    количеством.
+
+    Курсор хранит значения всех полей сортировки у крайней строки
+    страницы, следующая страница отбирается сравнением кортежей
+    (a, b, id) < (x, y, z), без OFFSET. Если запрос уже отсортирован
+    (ordering или поиск в RecipeFilter), ключом становится эта
+    сортировка, иначе - ordering по умолчанию; -id в конце делает
+    ключ уникальным.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            return max(int(request.query_params[self.page_size_query_param]),
+                       1)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by) or self.ordering
+        if not all(isinstance(field, str) for field in ordering):
+            raise ValidationError(
+                'Эта сортировка не поддерживает курсорную пагинацию'
+            )
+        ordering = tuple(
+            field[:-2] + 'id' if field.lstrip('-') == 'pk' else field
+            for field in ordering
+        )
+        if not {'id', '-id'} & set(ordering):
+            ordering += ('-id',)
+        return ordering
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')).decode())
+            position, reverse = data['p'], bool(data['r'])
+            if len(position) != len(self.current_ordering):
+                raise ValueError
+            values = []
+            for field, value in zip(self.current_ordering, position):
+                name = field.lstrip('-')
+                try:
+                    value = model._meta.get_field(name).to_python(value)
+                except FieldDoesNotExist:
+                    # Аннотация, например ранг поиска
+                    pass
+                values.append(value)
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            getattr(obj, field.lstrip('-')) for field in self.current_ordering
+        ]
+        # isoformat, а не DjangoJSONEncoder: тот отбрасывает микросекунды
+        data = json.dumps(
+            {'p': position, 'r': int(reverse)},
+            default=lambda value: value.isoformat()
+        )
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            b64encode(data.encode()).decode('ascii')
+        )
+
+    @staticmethod
+    def after(ordering, position):
+        """Условие "строка идёт после position" для сортировки ordering"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.current_ordering = self.get_ordering(queryset)
+        self.count = approximate_count(queryset)
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.current_ordering
+        if reverse:
+            # Предыдущая страница - та же выборка в обратном порядке
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        page_size = self.get_page_size(request)
+        page = list(queryset[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(CustomPagination):
+    """Постраничная пагинация или, по запросу, курсорная.
+
+    Курсорный режим включается параметром ?pagination=cursor,
+    ссылки next/previous сохраняют его сами. cursor_ordering - ключ,
+    если фильтр не задал свою сортировку.
+    """
+    cursor_ordering = ('-pub_date', '-id')
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('pagination') == 'cursor':
+            self.keyset = KeysetPagination(self.cursor_ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class UsersPagination(FeedPagination):
+    cursor_ordering = ('-id',)
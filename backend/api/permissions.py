@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -20,3 +21,12 @@ class IsAdminAuthorOrReadOnlyPermission(permissions.BasePermission):
             request.method in permissions.SAFE_METHODS
             or request.user.is_staff
             or obj.author == request.user)
+
+
+class IsStaffOrMetricsHost(permissions.BasePermission):
+    """Метрики видны администраторам и с адресов METRICS_ALLOWED_IPS"""
+    def has_permission(self, request, view):
+        return (
+            request.user.is_staff
+            or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        )
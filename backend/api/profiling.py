@@ -0,0 +1,127 @@
+"""Профилирование SQL-запросов каждого HTTP-запроса.
+
+Включается настройкой SQL_PROFILING. Для каждого запроса пишет в лог
+api.profiling строку JSON с числом запросов, временем SQL, временем
+ответа и повторяющимися запросами, а в ответ добавляет Server-Timing.
+Сводку по логу строит команда profile_report.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+DUPLICATES_LIMIT = 5
+SAMPLE_LENGTH = 300
+
+
+def fingerprint(sql):
+    """Шаблон запроса без значений: одинаков у запросов из цикла N+1"""
+    sql = IN_LIST.sub('IN (...)', sql)
+    return hashlib.md5(sql.encode()).hexdigest()[:12], sql
+
+
+def shorten(sql):
+    """Начало и конец длинного запроса: в конце обычно условие WHERE"""
+    if len(sql) <= SAMPLE_LENGTH:
+        return sql
+    half = SAMPLE_LENGTH // 2
+    return f'{sql[:half]} ... {sql[-half:]}'
+
+
+def view_name(view_func, method):
+    """Имя вида для отчёта, у вьюсетов DRF - вместе с действием"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__qualname__}'
+    name = f'{cls.__module__}.{cls.__qualname__}'
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    return f'{name}.{action}' if action else name
+
+
+class QueryRecorder:
+    """execute_wrapper, запоминающий шаблоны и длительность запросов"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key, template = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.samples.setdefault(key, template)
+
+    def duplicates(self):
+        return [
+            {'fingerprint': key, 'count': count,
+             'sql': shorten(self.samples[key])}
+            for key, count in self.fingerprints.most_common(DUPLICATES_LIMIT)
+            if count > 1
+        ]
+
+
+def limits_for(view):
+    limits = {
+        'queries': settings.SQL_PROFILING_MAX_QUERIES,
+        'sql_ms': settings.SQL_PROFILING_MAX_SQL_MS,
+    }
+    limits.update(settings.SQL_PROFILING_VIEW_LIMITS.get(view, {}))
+    return limits
+
+
+class SQLProfilingMiddleware:
+    """Считает SQL-запросы запроса и пишет результат в лог"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.duration * 1000
+        view = getattr(request, 'profiling_view', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(sql_ms, 2),
+            'wall_ms': round(wall_ms, 2),
+            'duplicates': recorder.duplicates(),
+        }
+        limits = limits_for(view)
+        record['slow'] = (
+            recorder.count > limits['queries'] or sql_ms > limits['sql_ms']
+        )
+        level = logging.WARNING if record['slow'] else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.2f};desc="{recorder.count} queries", '
+            f'app;dur={wall_ms:.2f}'
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profiling_view = view_name(view_func, request.method)
@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 
-from .fields import Base64ImageField
+from .fields import Base64ImageField, ImageRenditionsField
 from core.models import Ingredient, IngredientRecipe, Recipe, Tag
 
 User = get_user_model()
@@ -46,12 +48,14 @@ class UserSerializer(UserSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return user.subscriber.filter(author=obj).exists()
 
 
 class SubscribeSerializer(UserSerializer):
     """Сериализатор для подписок"""
-    recipes_count = SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
     recipes = SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -63,11 +67,6 @@ class SubscribeSerializer(UserSerializer):
     def validate(self, data):
         author = self.instance
         user = self.context.get('request').user
-        if user.subscribing.filter(author=author).exists():
-            raise ValidationError(
-                detail='Вы уже подписаны на этого пользователя',
-                code=status.HTTP_400_BAD_REQUEST
-            )
         if user == author:
             raise ValidationError(
                 detail='Вы не можете подписаться на самого себя',
@@ -75,14 +74,11 @@ class SubscribeSerializer(UserSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = obj.recipes.all()
-        if limit:
+        if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
         serializer = ShortRecipeSerializer(recipes, many=True, read_only=True)
         return serializer.data
@@ -106,13 +102,13 @@ class TagSerializer(serializers.ModelSerializer):
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
     """Сериализатор для связывания ингредиента с рецептом для записи"""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientRecipe
         fields = ['id', 'amount']
+        # У amount в модели есть default, без этого поле необязательно
+        extra_kwargs = {'amount': {'required': True}}
 
 
 class IngredientRecipeSerializer(serializers.ModelSerializer):
@@ -132,10 +128,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления рецептов"""
     author = UserSerializer(read_only=True)
     name = serializers.CharField(max_length=254)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField(allow_null=True)
     ingredients = IngredientAmountSerializer(many=True)
 
@@ -144,76 +137,129 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'tags', 'author', 'ingredients', 'name', 'image',
                   'text', 'cooking_time']
 
-    def validate_ingredients(self, ingredients):
+    def get_ingredients(self, ids):
+        """Ингредиенты по id; при пакетной загрузке берутся из контекста"""
+        known = self.context.get('ingredients')
+        if known is None:
+            known = Ingredient.objects.in_bulk(ids)
+        return known
+
+    def get_tags(self, ids):
+        known = self.context.get('tags')
+        if known is None:
+            known = Tag.objects.in_bulk(ids)
+        return known
+
+    def check_ingredients(self, ingredients):
         if not ingredients:
-            raise ValidationError('Отсутствие ингредиентов')
-        for ingredient in ingredients:
-            ingredient_id = ingredient['id']
-            if ingredient_id in ingredients:
-                raise ValidationError(
-                    f'Такой ингредиент:{ingredient} уже добавлен'
+            return ['Требуется выбрать хотя бы один ингредиент!']
+        known = self.get_ingredients(
+            [item['id'] for item in ingredients if 'id' in item]
+        )
+        errors = []
+        seen = set()
+        for item in ingredients:
+            # При PATCH вложенный сериализатор тоже partial, поэтому
+            # required у полей не проверяется
+            pk = item.get('id')
+            amount = item.get('amount')
+            if pk is None:
+                errors.append('Не указан id ингредиента')
+            elif pk not in known:
+                errors.append(f'Ингредиента с id={pk} не существует')
+            elif pk in seen:
+                errors.append(f'Ингредиент {known[pk]} повторяется')
+            if amount is None:
+                errors.append(f'Не указано количество ингредиента с id={pk}')
+            elif amount < 1:
+                errors.append(
+                    f'Недопустимое количество ингредиента с id={pk}'
                 )
-            amount = ingredient['amount']
-            if not int(amount) > 0:
-                raise ValidationError('Недопустимое количество ингредиентов')
-        return ingredients
-
-    def validate_tags(self, tags):
-        if not tags:
-            raise ValidationError('Отсутствие тега')
-        validated_tags = set()
-        for tag in tags:
-            validated_tags.add(tag)
-        return validated_tags
+            seen.add(pk)
+        return errors
+
+    def check_tags(self, tag_ids):
+        if not tag_ids:
+            return [], ['Требуется выбрать хотя бы один тег!']
+        known = self.get_tags(tag_ids)
+        missing = sorted(set(tag_ids) - set(known))
+        errors = [f'Тега с id={pk} не существует' for pk in missing]
+        tags = [known[pk] for pk in dict.fromkeys(tag_ids) if pk in known]
+        return tags, errors
 
     def validate(self, data):
-        ingredients = data['ingredients']
-        if not ingredients:
-            raise ValidationError(
-                'Требуется выбрать хотя бы один ингредиент!',
-                code=status.HTTP_400_BAD_REQUEST,
-            )
-        know_ingredients = []
-        for ingredient in ingredients:
-            if ingredient['id'] in know_ingredients:
-                raise ValidationError(
-                    'Ингредиенты повторяются',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            know_ingredients.append(ingredient['id'])
+        """Проверяет ингредиенты и теги за один проход и сообщает
+        обо всех ошибках сразу"""
+        errors = {}
+        if 'ingredients' in data:
+            ingredient_errors = self.check_ingredients(data['ingredients'])
+            if ingredient_errors:
+                errors['ingredients'] = ingredient_errors
+        if 'tags' in data:
+            data['tags'], tag_errors = self.check_tags(data['tags'])
+            if tag_errors:
+                errors['tags'] = tag_errors
+        if errors:
+            raise ValidationError(errors)
         return data
 
     def add_ingredients(self, ingredients, recipe):
         IngredientRecipe.objects.bulk_create(
             [IngredientRecipe(
                 recipe=recipe,
-                ingredient=ingredient['id'],
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
             ) for ingredient in ingredients]
         )
 
-    def add_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+    def update_ingredients(self, ingredients, recipe):
+        """Меняет только те строки, которые действительно изменились"""
+        current = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_amounts.all()
+        }
+        desired = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_create = [
+            IngredientRecipe(recipe=recipe, ingredient_id=pk, amount=amount)
+            for pk, amount in desired.items() if pk not in current
+        ]
+        to_update = []
+        for pk, amount in desired.items():
+            item = current.get(pk)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                to_update.append(item)
+        to_delete = [
+            item.pk for pk, item in current.items() if pk not in desired
+        ]
+        if to_delete:
+            IngredientRecipe.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            IngredientRecipe.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            IngredientRecipe.objects.bulk_create(to_create)
 
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        self.add_tags(tags, recipe)
-        self.add_ingredients(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.set(tags)
+            self.add_ingredients(ingredients, recipe)
         return recipe
 
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.add_ingredients(recipe=instance,
-                             ingredients=ingredients)
-        instance.save()
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if tags is not None:
+                instance.tags.set(tags)
+            if ingredients is not None:
+                self.update_ingredients(ingredients, instance)
         return instance
 
     def to_representation(self, recipe):
@@ -233,6 +279,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         source='ingredient_amounts'
     )
     image = Base64ImageField(allow_null=True)
+    renditions = ImageRenditionsField(source='*')
     name = serializers.CharField(max_length=254)
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
@@ -241,7 +288,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = [
             'id', 'tags', 'author',
-            'ingredients', 'name', 'image',
+            'ingredients', 'name', 'image', 'renditions',
             'text', 'cooking_time',
             'is_favorited', 'is_in_shopping_cart'
         ]
@@ -250,18 +297,35 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return user.shopping_cart.filter(recipe=obj).exists()
 
 
+class PantryRecipeSerializer(RecipeReadSerializer):
+    """Сериализатор рецептов с долей ингредиентов, которые уже есть"""
+    matched_ingredients = serializers.ReadOnlyField(source='matched')
+    total_ingredients = serializers.ReadOnlyField(source='total')
+    coverage = serializers.ReadOnlyField()
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + [
+            'matched_ingredients', 'total_ingredients', 'coverage'
+        ]
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов в сокращённой форме"""
     image = Base64ImageField()
+    renditions = ImageRenditionsField(source='*')
 
     class Meta:
         model = Recipe
@@ -269,5 +333,15 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'renditions',
             'cooking_time'
         )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций"""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_LIMIT,
+    )
@@ -0,0 +1,190 @@
+"""Выгрузка списка покупок в txt, csv и pdf потоком"""
+import csv
+
+from django.db.models import Sum
+
+from core.models import IngredientRecipe
+
+TITLE = 'Список покупок'
+
+
+def get_shopping_list(user):
+    """Суммы ингредиентов из корзины пользователя одним запросом"""
+    return IngredientRecipe.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        amount_sum=Sum('amount')
+    ).order_by(
+        'ingredient__name'
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount_sum'
+    ).iterator()
+
+
+class TextRenderer:
+    """Простой текстовый список"""
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def render(self, rows):
+        yield f'{TITLE}:\n'
+        for name, unit, amount in rows:
+            yield f'{name} ({unit}) - {amount}\n'
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку"""
+    def write(self, value):
+        return value
+
+
+class CsvRenderer:
+    """Список в формате CSV"""
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def render(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество')
+        )
+        for row in rows:
+            yield writer.writerow(row)
+
+
+def cyrillic_glyphs():
+    """Имена глифов кириллицы для позиций cp1251.
+
+    Глифы берутся из шрифта программы просмотра, см. PdfRenderer
+    """
+    upper = [10017 + i for i in range(33) if i != 6]
+    lower = [10065 + i for i in range(33) if i != 6]
+    glyphs = ' '.join(f'/afii{code}' for code in upper + lower)
+    return f'168 /afii10023 184 /afii10071 192 {glyphs}'
+
+
+class PdfRenderer:
+    """PDF, который пишется постранично.
+
+    В памяти держится только текущая страница и смещения объектов,
+    поэтому размер списка на расход памяти почти не влияет.
+
+    Шрифт не встраивается: текст набран стандартной /Helvetica, а
+    кириллица подставляется через /Differences по именам глифов afii.
+    Своей кириллицы в Helvetica нет, глифы ищет программа просмотра
+    в заменяющем шрифте, так что результат зависит от неё: без шрифта
+    с кириллицей вместо букв будут пустые места или «?». Надёжный
+    вариант для таких клиентов - выгрузка в txt или csv.
+    """
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    encoding = 'cp1251'
+    page_width = 595
+    page_height = 842
+    margin = 50
+    font_size = 12
+    leading = 16
+    catalog_id = 1
+    pages_id = 2
+    font_id = 3
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = self.font_id + 1
+
+    @property
+    def lines_per_page(self):
+        return (self.page_height - 2 * self.margin) // self.leading
+
+    def chunk(self, data):
+        self.offset += len(data)
+        return data
+
+    def obj(self, obj_id, body):
+        self.offsets[obj_id] = self.offset
+        return self.chunk(
+            f'{obj_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+        )
+
+    def escape(self, line):
+        data = line.encode(self.encoding, errors='replace')
+        return (data.replace(b'\\', b'\\\\')
+                .replace(b'(', b'\\(')
+                .replace(b')', b'\\)'))
+
+    def page(self, lines):
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        top = self.page_height - self.margin
+        stream = [
+            f'BT /F1 {self.font_size} Tf {self.leading} TL '
+            f'{self.margin} {top} Td'.encode()
+        ]
+        stream.extend(b'(' + self.escape(line) + b") '" for line in lines)
+        stream.append(b'ET')
+        stream = b'\n'.join(stream)
+        yield self.obj(
+            content_id,
+            f'<< /Length {len(stream)} >>\nstream\n'.encode()
+            + stream + b'\nendstream'
+        )
+        yield self.obj(page_id, (
+            f'<< /Type /Page /Parent {self.pages_id} 0 R '
+            f'/MediaBox [0 0 {self.page_width} {self.page_height}] '
+            f'/Resources << /Font << /F1 {self.font_id} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>'
+        ).encode())
+
+    def lines(self, rows):
+        yield f'{TITLE}:'
+        for num, (name, unit, amount) in enumerate(rows, start=1):
+            yield f'{num}. {name} ({unit}) - {amount}'
+
+    def render(self, rows):
+        yield self.chunk(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        yield self.obj(self.font_id, (
+            '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            f'/Differences [{cyrillic_glyphs()}] >> >>'
+        ).encode())
+        buffer = []
+        for line in self.lines(rows):
+            buffer.append(line)
+            if len(buffer) == self.lines_per_page:
+                yield from self.page(buffer)
+                buffer = []
+        if buffer:
+            yield from self.page(buffer)
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        yield self.obj(self.pages_id, (
+            f'<< /Type /Pages /Kids [{kids}] '
+            f'/Count {len(self.page_ids)} >>'
+        ).encode())
+        yield self.obj(
+            self.catalog_id,
+            f'<< /Type /Catalog /Pages {self.pages_id} 0 R >>'.encode()
+        )
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [f'xref\n0 {size}\n0000000000 65535 f \n']
+        xref.extend(
+            f'{self.offsets[obj_id]:010d} 00000 n \n'
+            for obj_id in range(1, size)
+        )
+        xref.append(
+            f'trailer\n<< /Size {size} /Root {self.catalog_id} 0 R >>\n'
+            f'startxref\n{xref_offset}\n%%EOF\n'
+        )
+        yield ''.join(xref).encode()
+
+
+RENDERERS = {
+    'txt': TextRenderer,
+    'csv': CsvRenderer,
+    'pdf': PdfRenderer,
+}
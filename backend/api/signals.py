@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import invalidate_on_commit
+from core.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+CACHED_MODELS = (Recipe, Tag, Ingredient, IngredientRecipe, User)
+
+
+def invalidate_on_change(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_on_commit()
+
+
+# Получатели подключаются только к нужным моделям: с получателем без
+# sender Django не может удалять строки остальных моделей одним DELETE
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_on_change, sender=model)
+    post_delete.connect(invalidate_on_change, sender=model)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_on_tags_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_on_commit()
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    token_cache.delete_user(instance.pk)
@@ -1,22 +1,37 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .bulk import create_recipes
+from .cache import AnonymousCacheMixin
+from .cart import add_favorites_to_cart, add_to_cart, remove_from_cart
 from .filters import RecipeFilter
-from .pagination import CustomPagination
-from .permissions import IsAdminAuthorOrReadOnlyPermission
+from .metrics import collect, render
+from .pagination import CustomPagination, FeedPagination, KeysetPagination
+from .permissions import (
+    IsAdminAuthorOrReadOnlyPermission,
+    IsStaffOrMetricsHost
+)
 from .serializers import (
     AddRecipeSerializer,
     IngredientSerializer,
+    PantryRecipeSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     ShortRecipeSerializer,
     TagSerializer
 )
+from .shopping_list import RENDERERS, get_shopping_list
+from core.autocomplete import ingredient_index
+from core.counters import increment
+from core.db import insert_ignore
 from core.models import (
     Favorite,
     Ingredient,
@@ -27,34 +42,48 @@ from core.models import (
 )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AnonymousCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(AnonymousCacheMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Вьюсет для ингредиентов"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     permission_classes = (AllowAny,)
 
-    def get_queryset(self):
-        queryset = self.queryset
-        name = self.request.query_params.get('name')
-        return queryset.filter(name__startswith=name)
+    def list(self, request, *args, **kwargs):
+        return self.cached(self.autocomplete, request)
+
+    def autocomplete(self, request):
+        name = request.query_params.get('name', '')
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        serializer = self.get_serializer(
+            ingredient_index.search(name, limit), many=True
+        )
+        return Response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов"""
     queryset = Recipe.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
     permission_classes = (IsAdminAuthorOrReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(user)
+        return Recipe.objects.with_user_flags(user)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user,)
 
@@ -63,6 +92,119 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return AddRecipeSerializer
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response('Ожидается список рецептов',
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.RECIPE_BULK_LIMIT:
+            return Response(
+                f'Не больше {settings.RECIPE_BULK_LIMIT} рецептов за раз',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        recipes, errors = create_recipes(
+            items, request.user, {'request': request}
+        )
+        data = {
+            'created': [
+                {'index': index, 'id': recipe.pk}
+                for index, recipe in recipes.items()
+            ],
+            'errors': [
+                {'index': index, 'errors': error}
+                for index, error in errors.items()
+            ],
+        }
+        if recipes:
+            return Response(data, status=status.HTTP_201_CREATED)
+        return Response(data, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        queryset = self.filter_queryset(
+            Recipe.objects.for_read(request.user).feed(request.user)
+        )
+        paginator = KeysetPagination(FeedPagination.cursor_ordering)
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = RecipeReadSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def by_ingredients(self, request):
+        have = request.query_params.get('have', '')
+        try:
+            ingredient_ids = {int(pk) for pk in have.split(',') if pk}
+        except ValueError:
+            return Response('Параметр have - список id через запятую',
+                            status=status.HTTP_400_BAD_REQUEST)
+        ranked = IngredientRecipe.objects.coverage(ingredient_ids)
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(ranked, request, view=self)
+        recipes = Recipe.objects.for_read(request.user).in_bulk(
+            [row['recipe'] for row in page]
+        )
+        results = []
+        for row in page:
+            recipe = recipes.get(row['recipe'])
+            if recipe is None:
+                # Рецепт удалён между подбором и загрузкой
+                continue
+            recipe.total = row['total']
+            recipe.matched = row['matched']
+            recipe.coverage = row['coverage']
+            results.append(recipe)
+        serializer = PantryRecipeSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+    )
+    def bulk_shopping_cart(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            added = add_to_cart(request.user, recipe_ids)
+            return Response({'added': added}, status=status.HTTP_201_CREATED)
+        remove_from_cart(request.user, recipe_ids)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/from_favorites',
+    )
+    def shopping_cart_from_favorites(self, request):
+        added = add_favorites_to_cart(request.user)
+        return Response({'added': added}, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=['delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart/clear',
+    )
+    def clear_shopping_cart(self, request):
+        remove_from_cart(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -84,21 +226,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.delete_recipe(Favorite, request.user, pk)
 
     def add_recipe(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
-            return Response('Этот рецпт уже есть',
-                            status=status.HTTP_400_BAD_REQUEST)
         recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            if not insert_ignore(model, user=user, recipe=recipe):
+                return Response('Этот рецпт уже есть',
+                                status=status.HTTP_400_BAD_REQUEST)
+            increment(Recipe.objects.filter(pk=recipe.pk),
+                      model.counter_field)
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_recipe(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response('Такого рецепта уже нет',
-                        status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(user=user, recipe_id=pk).delete()
+            if not deleted:
+                return Response('Такого рецепта уже нет',
+                                status=status.HTTP_400_BAD_REQUEST)
+            increment(Recipe.objects.filter(pk=pk), model.counter_field, -1)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
@@ -107,22 +252,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_path='download_shopping_cart',
     )
     def download_shopping_cart(self, request):
-        ingredient_list = 'Cписок покупок:'
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount_sum=Sum('amount'))
-        for num, i in enumerate(ingredients):
-            ingredient_list += (
-                f"\n{i['ingredient__name']} - "
-                f"{i['amount_sum']} {i['ingredient__measurement_unit']}"
-            )
-            if num < ingredients.count() - 1:
-                ingredient_list += ', '
-        file = 'shopping_list'
-        response = HttpResponse(
-            ingredient_list, 'Content-Type: application/pdf'
+        renderer_class = RENDERERS.get(request.query_params.get('type', 'pdf'))
+        if renderer_class is None:
+            return Response('Неизвестный формат списка покупок',
+                            status=status.HTTP_400_BAD_REQUEST)
+        renderer = renderer_class()
+        response = StreamingHttpResponse(
+            renderer.render(get_shopping_list(request.user)),
+            content_type=renderer.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.extension}"'
         )
-        response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
         return response
+
+
+class MetricsView(APIView):
+    """Метрики всех воркеров в формате Prometheus"""
+    permission_classes = (IsStaffOrMetricsHost,)
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            raise Http404('Метрики отключены')
+        return HttpResponse(
+            render(collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
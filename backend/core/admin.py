@@ -12,7 +12,7 @@ class IngredientInline(admin.TabularInline):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
-        'name', 'author', 'get_image',
+        'name', 'author', 'favorites_count', 'in_carts_count', 'get_image',
     )
     fields = (
         ('name', 'cooking_time',),
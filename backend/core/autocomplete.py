@@ -0,0 +1,70 @@
+"""Индекс ингредиентов в памяти процесса для автодополнения"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный по имени список ингредиентов.
+
+    Префиксные совпадения ищутся бинарным поиском, подстроки - проходом
+    по списку. Индекс сбрасывается сигналами при изменении ингредиентов
+    и перестраивается по истечении INGREDIENT_INDEX_TTL, чтобы другие
+    воркеры тоже увидели изменения.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self):
+        self._state = None
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(), key=lambda item: item.name.lower()
+        )
+        keys = [ingredient.name.lower() for ingredient in ingredients]
+        return time.monotonic(), keys, ingredients
+
+    def _get_state(self):
+        state = self._state
+        ttl = settings.INGREDIENT_INDEX_TTL
+        if state is None or time.monotonic() - state[0] > ttl:
+            with self._lock:
+                state = self._state
+                if state is None or time.monotonic() - state[0] > ttl:
+                    state = self._state = self._build()
+        return state
+
+    def all(self):
+        return self._get_state()[2]
+
+    def search(self, query, limit=None):
+        """Сначала ингредиенты, начинающиеся с query, затем содержащие его"""
+        _, keys, ingredients = self._get_state()
+        query = query.strip().lower()
+        if not query:
+            return ingredients[:limit]
+        result = []
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        result.extend(ingredients[start:end])
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        for position, key in enumerate(keys):
+            if start <= position < end or query not in key:
+                continue
+            result.append(ingredients[position])
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+ingredient_index = IngredientIndex()
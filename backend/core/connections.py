@@ -0,0 +1,59 @@
+"""Постоянные соединения с БД: проверка перед запросом и статистика.
+
+При CONN_MAX_AGE > 0 воркер держит соединение между запросами. Если
+соединение оборвалось (перезапуск PostgreSQL или pgbouncer, таймаут
+на сетевом оборудовании), первый запрос после этого упал бы с ошибкой.
+check_connections перед запросом проверяет соединения, простаивавшие
+дольше DB_HEALTH_CHECK_INTERVAL секунд, и закрывает неживые, чтобы Django
+открыл новые, - как CONN_HEALTH_CHECKS в Django 4.1.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def count(event):
+    with _lock:
+        _stats[event] += 1
+
+
+def stats():
+    """Открытые, переиспользованные и проверенные соединения процесса"""
+    with _lock:
+        return dict(_stats)
+
+
+def connection_opened(sender, connection, **kwargs):
+    count('opened')
+    connection.last_used = time.monotonic()
+
+
+def check_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        count('reused')
+        idle = now - getattr(connection, 'last_used', 0)
+        if (not settings.DB_CONN_HEALTH_CHECKS
+                or idle < settings.DB_HEALTH_CHECK_INTERVAL):
+            continue
+        count('health_checks')
+        if connection.is_usable():
+            connection.last_used = now
+        else:
+            count('unusable')
+            connection.close()
+
+
+def mark_used(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
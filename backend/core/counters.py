@@ -0,0 +1,37 @@
+"""Денормализованные счётчики рецептов и пользователей"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def increment(queryset, field, delta=1):
+    """Атомарно меняет счётчик одним UPDATE.
+
+    Уменьшение не опускает счётчик ниже нуля: строки, созданные в обход
+    счётчиков, не должны приводить к нарушению CHECK при удалении.
+    """
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    return queryset.update(**{field: value})
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def recount(recipe, user, favorite, shopping_cart, subscribe):
+    """Пересчитывает все счётчики по исходным таблицам"""
+    recipe.objects.update(
+        favorites_count=count_subquery(favorite, 'recipe'),
+        in_carts_count=count_subquery(shopping_cart, 'recipe'),
+    )
+    user.objects.update(
+        recipes_count=count_subquery(recipe, 'author'),
+        subscribers_count=count_subquery(subscribe, 'author'),
+    )
@@ -0,0 +1,121 @@
+"""Запросы, которые удобнее собрать вручную, чем через ORM"""
+from sqlite3 import sqlite_version_info
+
+from django.db import connections, router
+
+
+def prepare_values(model, connection, exclude=(), **values):
+    """Поля модели и их значения так, как их записал бы save()"""
+    obj = model(**values)
+    fields = [
+        field for field in model._meta.local_concrete_fields
+        if field is not model._meta.auto_field and field.name not in exclude
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for field in fields
+    ]
+    return fields, params
+
+
+def insert_ignore_sql(model, connection, fields, select):
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    return '{insert} {table} ({columns}) {select} {suffix}'.format(
+        insert=connection.ops.insert_statement(ignore_conflicts=True),
+        table=connection.ops.quote_name(model._meta.db_table),
+        columns=columns,
+        select=select,
+        suffix=connection.ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True
+        ),
+    )
+
+
+def insert_ignore(model, **values):
+    """Вставляет строку одним INSERT, пропуская нарушение уникальности.
+
+    Возвращает True, если строка добавлена, и False, если такая уже есть.
+    В отличие от проверки exists() перед create() не даёт гонки между
+    параллельными запросами. auto_now_add и default заполняются как при save().
+    """
+    connection = connections[router.db_for_write(model)]
+    fields, params = prepare_values(model, connection, **values)
+    sql = insert_ignore_sql(
+        model, connection, fields,
+        'VALUES ({})'.format(', '.join(['%s'] * len(fields)))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+
+def supports_returning(connection):
+    """INSERT и DELETE с RETURNING: PostgreSQL и SQLite с версии 3.35"""
+    if connection.vendor == 'postgresql':
+        return True
+    return (connection.vendor == 'sqlite'
+            and sqlite_version_info >= (3, 35))
+
+
+def insert_ignore_select(model, field, queryset, **values):
+    """Одним INSERT ... SELECT добавляет по строке на каждое значение
+    queryset с единственной колонкой; оно попадает в поле field, остальные
+    поля берутся из values. Существующие строки пропускаются.
+
+    Возвращает список значений field у добавленных строк. Без поддержки
+    RETURNING он вычисляется отдельным SELECT перед вставкой.
+    """
+    connection = connections[router.db_for_write(model)]
+    fields, params = prepare_values(model, connection, (field,), **values)
+    target = model._meta.get_field(field)
+    returning = supports_returning(connection)
+    if not returning:
+        existing = set(model.objects.filter(**values).values_list(
+            target.attname, flat=True
+        ))
+        added = [
+            value for value in dict.fromkeys(
+                next(iter(row.values())) for row in queryset
+            )
+            if value not in existing
+        ]
+    sql, source_params = queryset.query.sql_with_params()
+    select = 'SELECT src.*{} FROM ({}) src'.format(
+        ', %s' * len(fields), sql
+    )
+    sql = insert_ignore_sql(model, connection, [target] + fields, select)
+    if returning:
+        sql += ' RETURNING ' + connection.ops.quote_name(target.column)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, *source_params))
+        if returning:
+            added = [row[0] for row in cursor.fetchall()]
+    return added
+
+
+def delete_returning(queryset, field):
+    """Удаляет строки queryset одним DELETE и возвращает значения field
+    удалённых строк. Сигналы удаления не отправляются.
+    """
+    model = queryset.model
+    connection = connections[router.db_for_write(model)]
+    target = model._meta.get_field(field)
+    if not supports_returning(connection):
+        deleted = list(queryset.values_list(target.attname, flat=True))
+        queryset.delete()
+        return deleted
+    select, params = queryset.order_by().values(
+        'pk'
+    ).query.sql_with_params()
+    sql = 'DELETE FROM {table} WHERE {pk} IN ({select}) RETURNING {column}'
+    sql = sql.format(
+        table=connection.ops.quote_name(model._meta.db_table),
+        pk=connection.ops.quote_name(model._meta.pk.column),
+        select=select,
+        column=connection.ops.quote_name(target.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,108 @@
+"""Уменьшенные копии изображений рецептов, которые готовятся в фоне"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (300, 300),
+    'medium': (800, 800),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions',
+)
+
+
+def rendition_name(name, rendition):
+    stem = os.path.splitext(name)[0]
+    return f'renditions/{stem}_{rendition}.webp'
+
+
+def make_renditions(name):
+    """Сохраняет WebP-копии для всех размеров из RENDITIONS и отмечает
+    рецепты с этим изображением.
+
+    Хранилище не перезаписывает файлы, так что по имени изображения
+    копии не устаревают: готовые второй раз не создаются.
+    """
+    from .models import Recipe
+
+    try:
+        if not all(
+            default_storage.exists(rendition_name(name, rendition))
+            for rendition in RENDITIONS
+        ):
+            render(name)
+        Recipe.objects.filter(image=name).update(renditions_for=name)
+    except Exception:
+        logger.exception('Не удалось подготовить копии изображения %s', name)
+
+
+def make_renditions_in_background(name):
+    """make_renditions в потоке пула со своим соединением с БД.
+
+    Сигналы запросов не закрывают соединения потоков пула: без этого
+    поток держал бы соединение, оборванное перезапуском БД.
+    """
+    close_old_connections()
+    try:
+        make_renditions(name)
+    finally:
+        connection.close()
+
+
+def render(name):
+    with default_storage.open(name) as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    for rendition, size in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size)
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=80)
+        path = rendition_name(name, rendition)
+        default_storage.delete(path)
+        default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def renditions_ready(recipe):
+    return bool(recipe.image) and recipe.renditions_for == recipe.image.name
+
+
+def schedule_renditions(recipe):
+    """Ставит изображение рецепта в очередь после фиксации транзакции"""
+    if not recipe.image or renditions_ready(recipe):
+        return
+    name = recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(make_renditions_in_background, name)
+    )
+
+
+def rendition_urls(recipe):
+    """Ссылки на копии изображения; пока их нет - ссылка на оригинал.
+
+    Готовность копий берётся из Recipe.renditions_for, без обращений
+    к хранилищу.
+    """
+    image = recipe.image
+    if not image:
+        return None
+    if not renditions_ready(recipe):
+        return {rendition: image.url for rendition in RENDITIONS}
+    return {
+        rendition: default_storage.url(rendition_name(image.name, rendition))
+        for rendition in RENDITIONS
+    }
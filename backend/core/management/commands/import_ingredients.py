@@ -1,7 +1,10 @@
 import csv
+import json
+import time
 from pathlib import Path
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 
 from core.models import Ingredient
 from foodgram.settings import BASE_DIR
@@ -10,16 +13,74 @@ PROJECT_DIR = Path(BASE_DIR).resolve().joinpath('data')
 FILE_TO_OPEN = PROJECT_DIR / "ingredients.csv"
 
 
+def read_csv(path):
+    with open(path, encoding='utf-8') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        for item in json.load(file):
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
 class Command(BaseCommand):
     help = 'Команда для распаковки ингредиентов в базу'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(FILE_TO_OPEN),
+            help='CSV или JSON файл с ингредиентами'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк вставлять за один запрос'
+        )
+
     def handle(self, *args, **options):
-        with open(FILE_TO_OPEN, encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
-        print('Все ингридиенты загружены.')
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        seen = set()
+        batch = []
+        read = 0
+        with transaction.atomic():
+            for name, unit in reader(path):
+                read += 1
+                key = (name.strip(), unit.strip())
+                if key in seen:
+                    continue
+                seen.add(key)
+                batch.append(Ingredient(name=key[0], measurement_unit=key[1]))
+                if len(batch) >= batch_size:
+                    self.flush(batch, read, started)
+                    batch = []
+            if batch:
+                self.flush(batch, read, started)
+        created = Ingredient.objects.count() - before
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Все ингридиенты загружены: прочитано {read}, '
+            f'добавлено {created} за {elapsed:.2f} с '
+            f'({read / max(elapsed, 1e-6):.0f} строк/с).'
+        ))
+
+    def flush(self, batch, read, started):
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Обработано {read} строк '
+            f'({read / max(elapsed, 1e-6):.0f} строк/с)'
+        )
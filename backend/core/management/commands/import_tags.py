@@ -2,6 +2,11 @@ from django.core.management import BaseCommand
 
 from core.models import Tag
 
+TAGS = [
+    {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+    {'name': 'Обед', 'color': '#49B64E', 'slug': 'dinner'},
+    {'name': 'Ужин', 'color': '#8775D2', 'slug': 'supper'}]
+
 
 class Command(BaseCommand):
     help = 'Команда для создания тэгов в БД'
@@ -10,10 +15,6 @@ class Command(BaseCommand):
         """
         Запуск произвести командой python manage.py import_tags
         """
-        data = [
-            {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
-            {'name': 'Обед', 'color': '#49B64E', 'slug': 'dinner'},
-            {'name': 'Ужин', 'color': '#8775D2', 'slug': 'supper'}]
-        Tag.objects.bulk_create(Tag(**tag) for tag in data)
+        Tag.objects.bulk_create(Tag(**tag) for tag in TAGS)
         self.stdout.write(self.style.SUCCESS(
             'Импорт тегов произведен успешно!'))
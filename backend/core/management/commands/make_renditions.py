@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.db.models import F
+
+from core.images import make_renditions
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Команда для подготовки уменьшенных копий изображений '
+            'рецептов, загруженных до появления копий')
+
+    def handle(self, *args, **options):
+        names = list(Recipe.objects.exclude(
+            renditions_for=F('image')
+        ).exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct())
+        for number, name in enumerate(names, 1):
+            make_renditions(name)
+            self.stdout.write(f'{number}/{len(names)} {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Копии подготовлены для {len(names)} изображений.'
+        ))
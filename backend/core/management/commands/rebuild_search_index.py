@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from core.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Команда для пересчёта поискового индекса рецептов'
+
+    def handle(self, *args, **options):
+        update_search_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересчитан.'))
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from core.counters import recount
+from core.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+
+class Command(BaseCommand):
+    help = 'Команда для пересчёта счётчиков избранного, покупок и подписок'
+
+    def handle(self, *args, **options):
+        recount(Recipe, User, Favorite, ShoppingCart, Subscribe)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,189 @@
+import random
+import secrets
+import time
+from io import BytesIO
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+from PIL import Image
+
+from .import_tags import TAGS
+from core.counters import recount
+from core.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from core.search import update_search_index
+from users.models import Subscribe, User
+
+IMAGE_NAME = 'images/synthetic.png'
+PASSWORD = 'synthetic-password'
+
+
+def ensure_image():
+    if not default_storage.exists(IMAGE_NAME):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), '#E26C2D').save(buffer, 'PNG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return IMAGE_NAME
+
+
+class Command(BaseCommand):
+    help = ('Команда для заполнения базы синтетическими пользователями, '
+            'рецептами, подписками, избранным и списками покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Сколько ингредиентов в каждом рецепте'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='На скольких авторов подписан каждый пользователь'
+        )
+        parser.add_argument(
+            '--power-users', type=int, default=1,
+            help='Сколько пользователей подписаны на всех авторов'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Сколько рецептов в избранном у каждого пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=10,
+            help='Сколько рецептов в списке покупок у каждого пользователя'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора для воспроизводимых данных'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        if not Ingredient.objects.exists():
+            call_command('import_ingredients', stdout=self.stdout)
+        Tag.objects.bulk_create(
+            (Tag(**tag) for tag in TAGS), ignore_conflicts=True
+        )
+        run = secrets.token_hex(3)
+        with transaction.atomic():
+            users = self.create_users(run, options['users'])
+            recipes = self.create_recipes(run, users, options)
+            self.create_relations(users, recipes, options)
+            recount(Recipe, User, Favorite, ShoppingCart, Subscribe)
+        update_search_index(recipes)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)} '
+            f'за {elapsed:.2f} с. Логины synthetic_{run}_<номер>@example.com, '
+            f'пароль {PASSWORD}.'
+        ))
+
+    def insert(self, model, rows):
+        """bulk_create частями по batch_size без списка всех объектов"""
+        rows = iter(rows)
+        total = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return total
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+
+    def create_users(self, run, count):
+        password = make_password(PASSWORD)
+        prefix = f'synthetic_{run}_'
+        self.insert(User, (
+            User(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_recipes(self, run, users, options):
+        image = ensure_image()
+        prefix = f'Синтетический рецепт {run} '
+        self.insert(Recipe, (
+            Recipe(
+                author_id=self.random.choice(users),
+                name=f'{prefix}{number}',
+                text='Смешать ингредиенты и готовить до готовности. ' * 5,
+                image=image,
+                cooking_time=self.random.randint(1, 180),
+            )
+            for number in range(options['recipes'])
+        ))
+        recipes = list(Recipe.objects.filter(
+            name__startswith=prefix
+        ).order_by('pk').values_list('pk', flat=True))
+        ingredients = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        self.insert(IngredientRecipe, (
+            IngredientRecipe(
+                recipe_id=recipe,
+                ingredient_id=ingredient,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in self.random.sample(ingredients, per_recipe)
+        ))
+        tags = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        through = Recipe.tags.through
+        self.insert(through, (
+            through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.random.sample(
+                tags, self.random.randint(1, len(tags))
+            )
+        ))
+        return recipes
+
+    def sample(self, population, count):
+        return self.random.sample(population, min(count, len(population)))
+
+    def create_relations(self, users, recipes, options):
+        authors = list(User.objects.filter(
+            recipes__isnull=False
+        ).distinct().order_by('pk').values_list('pk', flat=True))
+        power_users = set(users[:options['power_users']])
+        self.insert(Subscribe, (
+            Subscribe(user_id=user, author_id=author)
+            for user in users
+            for author in (
+                authors if user in power_users
+                else self.sample(authors, options['subscriptions'])
+            )
+            if author != user
+        ))
+        self.insert(Favorite, (
+            Favorite(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['favorites'])
+        ))
+        self.insert(ShoppingCart, (
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['carts'])
+        ))
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from core.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = 'Команда для пересчёта популярности рецептов, запускать по cron'
+
+    def handle(self, *args, **options):
+        updated = update_trending()
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность пересчитана, новых событий у {updated} рецептов.'
+        ))
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:31
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# SQL записан здесь, а не взят из core.search: миграция должна делать
+# то же, что и в момент создания, как бы ни менялся код поиска
+INGREDIENT_NAMES = (
+    "SELECT {agg} FROM core_ingredientrecipe ir "
+    "JOIN core_ingredient i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = core_recipe.id"
+)
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+            'ON core_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE core_recipe SET search_vector = "
+            "setweight(to_tsvector(%(config)s, coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector(%(config)s, coalesce(({}), '')), 'B') || "
+            "setweight(to_tsvector(%(config)s, coalesce(text, '')), 'C')"
+            .format(INGREDIENT_NAMES.format(agg="string_agg(i.name, ' ')")),
+            {'config': settings.SEARCH_CONFIG}
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS core_recipe_fts '
+            'USING fts5(name, ingredients, text)'
+        )
+        schema_editor.execute(
+            "INSERT INTO core_recipe_fts (rowid, name, ingredients, text) "
+            "SELECT id, name, coalesce(({}), ''), text FROM core_recipe"
+            .format(INGREDIENT_NAMES.format(agg="group_concat(i.name, ' ')"))
+        )
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_auto_20261018_2126'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+from core.counters import recount
+
+
+def backfill_counters(apps, schema_editor):
+    recount(
+        apps.get_model('core', 'Recipe'),
+        apps.get_model('users', 'User'),
+        apps.get_model('core', 'Favorite'),
+        apps.get_model('core', 'ShoppingCart'),
+        apps.get_model('users', 'Subscribe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+        ('users', '0002_auto_20261018_2134'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_auto_20261018_2138'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Изображение, для которого готовы копии'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_renditions_for'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingcheckpoint',
+            name='counted',
+            field=models.TextField(default='{}', editable=False, verbose_name='Учтённые события в окне перекрытия (JSON)'),
+        ),
+    ]
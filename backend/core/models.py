@@ -1,7 +1,18 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import (
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q
+)
 
-from users.models import User
+from users.models import CountersMixin, Subscribe, User
 
 
 class Tag(models.Model):
@@ -42,12 +53,69 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='ingredient_name_prefix_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name[:79]
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Запросы рецептов с данными, зависящими от пользователя"""
+
+    def with_user_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart одним запросом"""
+        if user.is_anonymous:
+            return self
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def with_authors(self, user):
+        """Подгружает авторов вместе с признаком подписки на них"""
+        authors = User.objects.all()
+        if not user.is_anonymous:
+            authors = authors.annotate(is_subscribed=Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return self.prefetch_related(Prefetch('author', queryset=authors))
+
+    def feed(self, user):
+        """Рецепты авторов, на которых подписан пользователь"""
+        return self.filter(author__in=Subscribe.objects.filter(
+            user=user
+        ).values('author'))
+
+    def for_read(self, user):
+        """Всё, что нужно RecipeReadSerializer, за постоянное число запросов"""
+        return self.with_user_flags(user).with_authors(user).defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            ),
+        )
+
+
+class Recipe(CountersMixin, models.Model):
     """Класс рецептов"""
     name = models.CharField(
         max_length=200,
@@ -88,11 +156,66 @@ class Recipe(models.Model):
             MinValueValidator(1),
         ],
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность за последнее время'
+    )
+    renditions_for = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Изображение, для которого готовы копии'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    # Поля, которые меняются отдельными UPDATE и не пишутся в save()
+    counter_fields = (
+        'favorites_count', 'in_carts_count', 'trending_score',
+        'renditions_for',
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-pub_date'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-pub_date'],
+                name='recipe_trending_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-pub_date'],
+                name='recipe_cooking_time_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'name'],
@@ -103,6 +226,27 @@ class Recipe(models.Model):
         return f'{self.name}, {self.author}'
 
 
+class IngredientRecipeQuerySet(models.QuerySet):
+
+    def coverage(self, ingredient_ids):
+        """Доля ингредиентов каждого рецепта, которые есть в ingredient_ids.
+
+        Группирует только рецепты, где нашёлся хотя бы один ингредиент,
+        и сортирует их по убыванию доли.
+        """
+        matching = self.filter(ingredient__in=ingredient_ids)
+        return self.filter(
+            recipe__in=matching.values('recipe')
+        ).values('recipe').annotate(
+            total=Count('id'),
+            matched=Count('id', filter=Q(ingredient__in=ingredient_ids)),
+        ).annotate(
+            coverage=ExpressionWrapper(
+                F('matched') * 1.0 / F('total'), output_field=FloatField()
+            )
+        ).order_by('-coverage', '-matched', '-recipe_id')
+
+
 class IngredientRecipe(models.Model):
     """Модель для реализации отношения ManyToMany ingredient_id -- recipe_id"""
 
@@ -123,6 +267,8 @@ class IngredientRecipe(models.Model):
         default=0,
     )
 
+    objects = IngredientRecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Количество ингридиента'
         verbose_name_plural = 'Количество ингридиентов'
@@ -150,6 +296,13 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
+
+    counter_field = 'favorites_count'
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -182,6 +335,13 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления'
+    )
+
+    counter_field = 'in_carts_count'
 
     class Meta:
         verbose_name = 'Покупка'
@@ -198,3 +358,22 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в списке покупок {self.user}'
+
+
+class TrendingCheckpoint(models.Model):
+    """Момент последнего пересчёта Recipe.trending_score"""
+    updated_at = models.DateTimeField(
+        verbose_name='Дата пересчёта'
+    )
+    counted = models.TextField(
+        default='{}',
+        editable=False,
+        verbose_name='Учтённые события в окне перекрытия (JSON)'
+    )
+
+    class Meta:
+        verbose_name = 'Пересчёт популярности'
+        verbose_name_plural = 'Пересчёты популярности'
+
+    def __str__(self):
+        return f'Популярность пересчитана {self.updated_at}'
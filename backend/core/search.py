@@ -0,0 +1,97 @@
+"""Полнотекстовый поиск рецептов.
+
+В PostgreSQL поиск идёт по колонке Recipe.search_vector с GIN-индексом,
+в SQLite - по виртуальной таблице FTS5. Вес: название > ингредиенты > текст.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'core_recipe_fts'
+
+INGREDIENT_NAMES = (
+    "SELECT {agg} FROM core_ingredientrecipe ir "
+    "JOIN core_ingredient i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = core_recipe.id"
+)
+
+POSTGRES_UPDATE = (
+    "UPDATE core_recipe SET search_vector = "
+    "setweight(to_tsvector(%(config)s, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector(%(config)s, coalesce(({ingredients}), '')), 'B')"
+    " || setweight(to_tsvector(%(config)s, coalesce(text, '')), 'C')"
+).format(ingredients=INGREDIENT_NAMES.format(agg="string_agg(i.name, ' ')"))
+
+SQLITE_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) "
+    "SELECT id, name, coalesce(({ingredients}), ''), text FROM core_recipe"
+).format(ingredients=INGREDIENT_NAMES.format(agg="group_concat(i.name, ' ')"))
+
+
+def update_search_index(recipe_ids=None):
+    """Пересчитывает индекс для указанных рецептов или для всех"""
+    if recipe_ids is not None:
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql, params = POSTGRES_UPDATE, {'config': settings.SEARCH_CONFIG}
+            if recipe_ids is not None:
+                sql += ' WHERE id = ANY(%(ids)s)'
+                params['ids'] = recipe_ids
+            cursor.execute(sql, params)
+        elif connection.vendor == 'sqlite':
+            if recipe_ids is None:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+                cursor.execute(SQLITE_INSERT)
+                return
+            placeholders = ', '.join(['%s'] * len(recipe_ids))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids
+            )
+            cursor.execute(
+                f'{SQLITE_INSERT} WHERE id IN ({placeholders})', recipe_ids
+            )
+
+
+def schedule_search_update(recipe_ids):
+    """Обновляет индекс после фиксации текущей транзакции"""
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: update_search_index(recipe_ids))
+
+
+def fts_query(value):
+    words = value.replace('"', ' ').split()
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_recipes(queryset, value):
+    """Отбирает рецепты по запросу и сортирует по релевантности"""
+    if not value.strip():
+        return queryset
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=settings.SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date')
+    if connection.vendor == 'sqlite':
+        match = fts_query(value)
+        if not match:
+            return queryset
+        return queryset.extra(
+            where=[
+                f'core_recipe.id IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[match],
+        ).annotate(rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = core_recipe.id',
+            (match,)
+        )).order_by('rank', '-pub_date')
+    return queryset.filter(name__icontains=value)
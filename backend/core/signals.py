@@ -0,0 +1,99 @@
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .connections import check_connections, connection_opened, mark_used
+from .counters import increment
+from .images import schedule_renditions
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart
+)
+from .search import schedule_search_update
+from users.models import Subscribe, User
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def prepare_image_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, **kwargs):
+    schedule_search_update([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=IngredientRecipe)
+def update_ingredients_search(sender, instance, **kwargs):
+    schedule_search_update([instance.recipe_id])
+
+
+# Счётчики ведутся сигналами, чтобы их не обходили админка и каскадное
+# удаление. Вставки через insert_ignore и bulk_create сигналов не
+# отправляют, там счётчики меняет вызывающий код. У Favorite и
+# ShoppingCart нет получателей post_delete: иначе Django не удалял бы
+# их одним DELETE и параллельные удаления уменьшали бы счётчик дважды.
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    if created:
+        increment(User.objects.filter(pk=instance.author_id), 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    increment(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(post_save, sender=Subscribe)
+def count_created_subscription(sender, instance, created, **kwargs):
+    if created:
+        increment(
+            User.objects.filter(pk=instance.author_id), 'subscribers_count'
+        )
+
+
+@receiver(post_delete, sender=Subscribe)
+def count_deleted_subscription(sender, instance, **kwargs):
+    increment(
+        User.objects.filter(pk=instance.author_id), 'subscribers_count', -1
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def count_added_recipe(sender, instance, created, **kwargs):
+    if created:
+        increment(
+            Recipe.objects.filter(pk=instance.recipe_id), sender.counter_field
+        )
+
+
+@receiver(pre_delete, sender=User)
+def uncount_user_recipes(sender, instance, **kwargs):
+    """Избранное и покупки пользователя удалятся каскадом без сигналов"""
+    for model in (Favorite, ShoppingCart):
+        increment(
+            Recipe.objects.filter(
+                pk__in=model.objects.filter(user=instance).values('recipe')
+            ),
+            model.counter_field, -1
+        )
+
+
+# Подключаются после close_old_connections Django, которая уже закрыла
+# соединения старше CONN_MAX_AGE
+request_started.connect(check_connections)
+request_finished.connect(mark_used)
+connection_created.connect(connection_opened)
@@ -0,0 +1,81 @@
+"""Популярность рецептов с экспоненциальным затуханием во времени.
+
+Оценка рецепта - сумма весов добавлений в избранное и в список покупок,
+каждый вес уменьшается вдвое за TRENDING_HALF_LIFE_HOURS. При пересчёте
+все оценки умножаются на общий коэффициент затухания и к ним прибавляются
+только события, появившиеся после прошлого пересчёта.
+
+Время created ставится до фиксации транзакции, поэтому событие может
+стать видимым уже после пересчёта, который должен был его учесть.
+Каждый пересчёт заново просматривает TRENDING_OVERLAP_SECONDS до прошлого
+и пропускает события, id которых сохранены в TrendingCheckpoint.counted.
+"""
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart, TrendingCheckpoint
+
+EVENT_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingCart, 2.0),
+)
+MIN_SCORE = 1e-3
+
+
+def decay(delta):
+    hours = delta.total_seconds() / 3600
+    return 0.5 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+@transaction.atomic
+def update_trending(now=None):
+    """Пересчитывает trending_score, возвращает число затронутых рецептов"""
+    now = now or timezone.now()
+    checkpoint = TrendingCheckpoint.objects.select_for_update().first()
+    if checkpoint is None:
+        since = now - timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS * 10)
+        Recipe.objects.exclude(trending_score=0).update(trending_score=0)
+    else:
+        since = checkpoint.updated_at
+        Recipe.objects.filter(trending_score__gt=0).update(
+            trending_score=F('trending_score') * decay(now - since)
+        )
+        Recipe.objects.filter(
+            trending_score__gt=0, trending_score__lt=MIN_SCORE
+        ).update(trending_score=0)
+    overlap = timedelta(seconds=settings.TRENDING_OVERLAP_SECONDS)
+    counted = json.loads(checkpoint.counted) if checkpoint else {}
+    recent = {}
+    increments = defaultdict(float)
+    for model, weight in EVENT_WEIGHTS:
+        key = model._meta.model_name
+        seen = set(counted.get(key, ()))
+        recent[key] = []
+        events = model.objects.filter(
+            created__gt=since - overlap, created__lte=now
+        ).values_list('pk', 'recipe_id', 'created').iterator()
+        for pk, recipe_id, created in events:
+            if created > now - overlap:
+                recent[key].append(pk)
+            if pk not in seen:
+                increments[recipe_id] += weight * decay(now - created)
+    recipes = Recipe.objects.only('id', 'trending_score').in_bulk(
+        list(increments)
+    )
+    for pk, recipe in recipes.items():
+        recipe.trending_score += increments[pk]
+    Recipe.objects.bulk_update(
+        recipes.values(), ['trending_score'], batch_size=1000
+    )
+    if checkpoint is None:
+        checkpoint = TrendingCheckpoint(updated_at=now)
+    checkpoint.updated_at = now
+    checkpoint.counted = json.dumps(recent)
+    checkpoint.save()
+    return len(recipes)
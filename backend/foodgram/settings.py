@@ -42,6 +42,59 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+SQL_PROFILING = os.getenv('SQL_PROFILING', '').lower() in ('1', 'true', 'yes')
+
+SQL_PROFILING_LOG = os.getenv(
+    'SQL_PROFILING_LOG', os.path.join(BASE_DIR, 'sql_profile.log')
+)
+
+SQL_PROFILING_MAX_QUERIES = int(os.getenv('SQL_PROFILING_MAX_QUERIES', 20))
+
+SQL_PROFILING_MAX_SQL_MS = float(os.getenv('SQL_PROFILING_MAX_SQL_MS', 200))
+
+# Пороги для отдельных видов, например
+# {'api.views.RecipeViewSet.list': {'queries': 10, 'sql_ms': 100}}
+SQL_PROFILING_VIEW_LIMITS = {}
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '').lower() in (
+    '1', 'true', 'yes'
+)
+
+METRICS_DIR = os.getenv('METRICS_DIR', '/tmp/foodgram_metrics')
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'api.metrics.MetricsMiddleware')
+
+if SQL_PROFILING:
+    MIDDLEWARE.insert(0, 'api.profiling.SQLProfilingMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'message': {'format': '%(message)s'},
+        },
+        'handlers': {
+            'profiling': {
+                'class': 'logging.handlers.WatchedFileHandler',
+                'filename': SQL_PROFILING_LOG,
+                'formatter': 'message',
+            },
+        },
+        'loggers': {
+            'api.profiling': {
+                'handlers': ['profiling'],
+                'level': 'INFO',
+                'propagate': False,
+            },
+        },
+    }
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -73,10 +126,41 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Сколько секунд воркер держит соединение, 0 - закрывать после
+        # каждого запроса
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # pgbouncer в режиме transaction не поддерживает серверные курсоры,
+        # которые Django использует для QuerySet.iterator()
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_PGBOUNCER', ''
+        ).lower() in ('1', 'true', 'yes'),
     }
 }
 
+DB_CONN_HEALTH_CHECKS = os.getenv(
+    'DB_CONN_HEALTH_CHECKS', '1'
+).lower() in ('1', 'true', 'yes')
+
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60))
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,6 +194,22 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', 5 * 1024 * 1024)
+)
+
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+
+RECIPE_BULK_LIMIT = int(os.getenv('RECIPE_BULK_LIMIT', 500))
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'russian')
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 24))
+
+# Сколько секунд до прошлого пересчёта просматривать повторно: событие,
+# транзакция которого зафиксирована позже пересчёта, учтётся в следующем
+TRENDING_OVERLAP_SECONDS = int(os.getenv('TRENDING_OVERLAP_SECONDS', 300))
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
@@ -119,7 +219,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from .test_recipes import create_recipes
+from api.cache import GENERATION_KEY, stats
+from core.models import Ingredient, Tag
+from users.models import User
+
+
+class InvalidationTest(TransactionTestCase):
+    def setUp(self):
+        # Копии изображений готовятся в фоне после фиксации, здесь не нужны
+        patcher = mock.patch('core.signals.schedule_renditions')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        ingredients = [
+            Ingredient.objects.create(name=f'Продукт {number}',
+                                      measurement_unit='г')
+            for number in range(5)
+        ]
+        tags = [Tag.objects.create(name='Тег', color='#FFFFFF', slug='tag')]
+        self.recipe = create_recipes(author, 1, ingredients, tags)[0]
+
+    def invalidations(self):
+        return stats().get('invalidations', 0)
+
+    def test_invalidated_once_after_commit(self):
+        before = self.invalidations()
+        generation = cache.get(GENERATION_KEY)
+        with transaction.atomic():
+            self.recipe.delete()
+            self.assertEqual(cache.get(GENERATION_KEY), generation)
+        self.assertEqual(self.invalidations() - before, 1)
+
+    def test_rollback_keeps_cache(self):
+        before = self.invalidations()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.recipe.delete()
+            raise RuntimeError
+        self.assertEqual(self.invalidations(), before)
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .test_recipes import create_recipes
+from core.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+
+class CartCountersTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        cls.recipes = create_recipes(cls.user, 4, [], [])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        return list(Recipe.objects.order_by('pk').values_list(
+            'in_carts_count', flat=True
+        ))
+
+    def test_counters_follow_added_and_removed_rows(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        response = self.client.post(
+            '/api/recipes/shopping_cart/', {'recipes': ids[:2]},
+            format='json'
+        )
+        self.assertEqual(response.data, {'added': 2})
+        # Повтор и отсутствующий рецепт счётчики не меняют
+        response = self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': ids[:3] + [ids[-1] + 100]}, format='json'
+        )
+        self.assertEqual(response.data, {'added': 1})
+        Favorite.objects.create(user=self.user, recipe=self.recipes[3])
+        self.client.post('/api/recipes/shopping_cart/from_favorites/')
+        self.assertEqual(self.counters(), [1, 1, 1, 1])
+        self.client.delete(
+            '/api/recipes/shopping_cart/', {'recipes': ids[:1]},
+            format='json'
+        )
+        self.assertEqual(self.counters(), [0, 1, 1, 1])
+
+    def test_clear_is_single_delete(self):
+        for recipe in self.recipes:
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete('/api/recipes/shopping_cart/clear/')
+        self.assertEqual(response.status_code, 204)
+        statements = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if 'core_shoppingcart' in query['sql']
+        ]
+        self.assertEqual(statements, ['DELETE'])
+        self.assertEqual(self.counters(), [0, 0, 0, 0])
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Favorite, Recipe
+from users.models import Subscribe, User
+
+THREADS = 8
+REQUESTS = 32
+
+
+# В SQLite параллельные записи упираются в блокировку таблиц
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL')
+class FavoriteConcurrencyTest(TransactionTestCase):
+    def setUp(self):
+        # Копии изображений готовятся в фоне после фиксации, здесь не нужны
+        patcher = mock.patch('core.signals.schedule_renditions')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Описание',
+            image='images/test.png', cooking_time=10,
+        )
+
+    def post(self, number):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post(
+                f'/api/recipes/{self.recipe.pk}/favorite/'
+            ).status_code
+        finally:
+            # Каждый поток открывает своё соединение
+            connection.close()
+
+    def test_parallel_posts_create_one_favorite(self):
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            statuses = list(executor.map(self.post, range(REQUESTS)))
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), REQUESTS - 1, statuses)
+        self.assertEqual(Favorite.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+
+class UnsubscribeTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name='Имя', last_name='Фамилия',
+                password='password-123'
+            )
+            for name in ('reader', 'author')
+        )
+        Subscribe.objects.create(user=cls.user, author=cls.author)
+
+    def test_unsubscribe_is_single_delete(self):
+        self.client.force_authenticate(self.user)
+        path = f'/api/users/{self.author.pk}/subscribe/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(path)
+        self.assertEqual(response.status_code, 204)
+        statements = [
+            query['sql'].split()[0] for query in context.captured_queries
+            if 'users_subscribe' in query['sql']
+        ]
+        self.assertEqual(statements, ['DELETE'])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 0)
+        self.assertEqual(self.client.delete(path).status_code, 404)
@@ -0,0 +1,92 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import User
+
+AUTHORS = 20
+RECIPES = 2000
+INGREDIENTS = 1000
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL')
+class IndexUsageTest(TestCase):
+    """Планы горячих запросов ленты и поиска используют индексы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'author{number}',
+                 email=f'author{number}@example.com',
+                 first_name='Имя', last_name='Фамилия')
+            for number in range(AUTHORS)
+        )
+        cls.authors = list(User.objects.order_by('pk'))
+        Recipe.objects.bulk_create(
+            Recipe(author=cls.authors[number % AUTHORS],
+                   name=f'Рецепт {number}', text='Описание',
+                   image='images/test.png', cooking_time=number % 180 + 1)
+            for number in range(RECIPES)
+        )
+        recipes = list(Recipe.objects.order_by('pk')[:200])
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=author, recipe=recipe)
+                for author in cls.authors
+                for recipe in recipes[::AUTHORS // 2]
+            )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'продукт {number}', measurement_unit='г')
+            for number in range(INGREDIENTS)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        # На небольшой выборке последовательное чтение всегда дешевле;
+        # без него план показывает, подходит ли индекс к запросу
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assert_uses_index(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+
+    def test_feed(self):
+        self.assert_uses_index(
+            Recipe.objects.order_by('-pub_date', '-id')[:10],
+            'recipe_pub_date_idx'
+        )
+
+    def test_author_feed(self):
+        self.assert_uses_index(
+            Recipe.objects.filter(author=self.authors[0])[:10],
+            'recipe_author_pub_date_idx'
+        )
+
+    def test_popular(self):
+        self.assert_uses_index(
+            Recipe.objects.order_by('-favorites_count', '-pub_date')[:10],
+            'recipe_popular_idx'
+        )
+
+    def test_user_flags(self):
+        # Флаги в списке проверяются по строке на рецепт страницы:
+        # поиск по (user, recipe) в индексах ограничений уникальности
+        plan = Recipe.objects.with_user_flags(self.authors[0])[:10].explain()
+        self.assertIn('unique_favorite', plan, plan)
+        self.assertIn('unique_shopping_cart', plan, plan)
+
+    def test_ingredient_prefix(self):
+        self.assert_uses_index(
+            Ingredient.objects.filter(name__startswith='продукт 12'),
+            'ingredient_name_prefix_idx'
+        )
+
+    def test_ingredient_substring(self):
+        self.assert_uses_index(
+            Ingredient.objects.filter(name__icontains='дукт 12'),
+            'ingredient_name_trgm_idx'
+        )
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from api.metrics import ARCHIVE, collect
+
+KEY = ('foodgram_http_requests_total', (('status', '200'),))
+
+
+class MetricsFilesTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=self.directory
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def dead_worker_file(self, total):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        name = f'{process.pid}-test.json'
+        with open(os.path.join(self.directory, name), 'w') as file:
+            json.dump([
+                ['foodgram_http_requests_total', [['status', '200']], total],
+                ['foodgram_worker_last_flush_timestamp_seconds',
+                 [['pid', str(process.pid)]], 1.0],
+            ], file)
+        return name
+
+    def test_dead_workers_are_folded(self):
+        first = self.dead_worker_file(3)
+        self.assertEqual(collect().get(KEY), 3)
+        second = self.dead_worker_file(4)
+        self.assertEqual(collect().get(KEY), 7)
+        files = os.listdir(self.directory)
+        self.assertNotIn(first, files)
+        self.assertNotIn(second, files)
+        self.assertIn(ARCHIVE, files)
+        self.assertEqual(collect().get(KEY), 7)
+        self.assertFalse(any(
+            key[0] == 'foodgram_worker_last_flush_timestamp_seconds'
+            and key[1] != (('pid', str(os.getpid())),)
+            for key in collect()
+        ))
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_metrics_write_nothing(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(os.listdir(self.directory), [])
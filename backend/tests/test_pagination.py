@@ -0,0 +1,66 @@
+from rest_framework.test import APITestCase
+
+from .test_recipes import create_recipes
+from api.filters import RecipeFilter
+from core.models import Recipe
+from users.models import User
+
+
+class CursorPaginationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        recipes = create_recipes(cls.user, 25, [], [])
+        for number, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=number % 4,
+                trending_score=number % 3,
+                cooking_time=number % 5 + 1,
+            )
+        # Одинаковое время публикации: порядок решают остальные поля ключа
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes[:15]]
+        ).update(pub_date=recipes[0].pub_date)
+
+    def walk(self, params):
+        """id всех страниц по ссылкам next, затем обратно по previous"""
+        response = self.client.get(
+            '/api/recipes/', {**params, 'pagination': 'cursor', 'limit': 4}
+        )
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        forward = [
+            recipe['id'] for page in pages for recipe in page['results']
+        ]
+        backward = []
+        link = pages[-1]['previous']
+        while link:
+            page = self.client.get(link).data
+            backward = [recipe['id'] for recipe in page['results']] + backward
+            link = page['previous']
+        self.assertEqual(backward, forward[:len(backward)])
+        self.assertEqual(
+            len(backward), len(forward) - len(pages[-1]['results'])
+        )
+        return forward
+
+    def test_requested_ordering_is_kept(self):
+        orderings = dict(RecipeFilter.ORDERINGS, **{'': ('-pub_date',)})
+        for name, ordering in orderings.items():
+            with self.subTest(ordering=name):
+                self.assertEqual(
+                    self.walk({'ordering': name} if name else {}),
+                    list(Recipe.objects.order_by(
+                        *ordering, '-id'
+                    ).values_list('id', flat=True))
+                )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'pagination': 'cursor', 'cursor': 'garbage'}
+        )
+        self.assertEqual(response.status_code, 404)
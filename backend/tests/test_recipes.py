@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.serializers import AddRecipeSerializer
+from core.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from users.models import User
+
+
+def create_recipes(author, count, ingredients, tags):
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text='Описание',
+            image='images/test.png',
+            cooking_time=10,
+        )
+        recipe.tags.set(tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=5)
+            for ingredient in ingredients
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class RecipeListQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', color='#FFFFFF',
+                               slug=f'tag{number}')
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Продукт {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        recipes = create_recipes(author, 60, ingredients, tags)
+        for recipe in recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        for recipe in recipes[::3]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_page_queries_do_not_depend_on_limit(self):
+        # COUNT, рецепты с флагами, авторы, теги, ингредиенты
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/recipes/', {'limit': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 50)
+        with self.assertNumQueries(5):
+            self.client.get('/api/recipes/', {'limit': 10})
+
+    def test_flags_are_annotated(self):
+        response = self.client.get('/api/recipes/', {'limit': 60})
+        favorited = set(
+            Favorite.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )
+        )
+        in_cart = set(
+            ShoppingCart.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )
+        )
+        for recipe in response.data['results']:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorited)
+            self.assertEqual(
+                recipe['is_in_shopping_cart'], recipe['id'] in in_cart
+            )
+
+
+class RecipeIngredientsUpdateTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        cls.tags = [
+            Tag.objects.create(name='Тег', color='#FFFFFF', slug='tag')
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Продукт {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipe = create_recipes(
+            cls.author, 1, cls.ingredients, cls.tags
+        )[0]
+
+    def test_changed_amount_is_single_update(self):
+        request = APIRequestFactory().patch('/api/recipes/')
+        request.user = self.author
+        amounts = [5, 7, 5]
+        serializer = AddRecipeSerializer(
+            self.recipe,
+            data={
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': amount}
+                    for ingredient, amount in zip(self.ingredients, amounts)
+                ],
+            },
+            partial=True,
+            context={'request': request},
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+        statements = [
+            query['sql'].split()[0].upper()
+            for query in context.captured_queries
+            if 'core_ingredientrecipe' in query['sql']
+            and not query['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(statements, ['UPDATE'])
+        self.assertEqual(
+            list(self.recipe.ingredient_amounts.order_by(
+                'ingredient_id'
+            ).values_list('amount', flat=True)),
+            amounts
+        )
+
+    def test_patch_without_amount_is_rejected(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {'ingredients': [{'id': self.ingredients[0].pk}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertIn(
+            f'Не указано количество ингредиента с '
+            f'id={self.ingredients[0].pk}',
+            response.data['ingredients']
+        )
+
+
+class ByIngredientsTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        tags = [Tag.objects.create(name='Тег', color='#FFFFFF', slug='tag')]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Продукт {number}',
+                                      measurement_unit='г')
+            for number in range(2)
+        ]
+        cls.recipes = create_recipes(author, 2, cls.ingredients, tags)
+
+    def test_deleted_recipe_is_skipped(self):
+        coverage = IngredientRecipe.objects.coverage
+
+        def coverage_then_delete(ingredient_ids):
+            rows = list(coverage(ingredient_ids))
+            # Рецепт удаляют после подбора, но до загрузки
+            self.recipes[0].delete()
+            return rows
+
+        with mock.patch.object(IngredientRecipe.objects, 'coverage',
+                               side_effect=coverage_then_delete):
+            response = self.client.get(
+                '/api/recipes/by_ingredients/',
+                {'have': self.ingredients[0].pk}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[1].pk]
+        )
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .test_recipes import create_recipes
+from core.models import Favorite, Recipe
+from core.trending import update_trending
+from users.models import User
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=24, TRENDING_OVERLAP_SECONDS=300)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Имя', last_name='Фамилия', password='password-123'
+        )
+        cls.recipe = create_recipes(cls.user, 1, [], [])[0]
+
+    def favorite(self, created):
+        favorite = Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Favorite.objects.filter(pk=favorite.pk).update(created=created)
+
+    def score(self):
+        return Recipe.objects.get(pk=self.recipe.pk).trending_score
+
+    def test_late_commit_is_counted_once(self):
+        now = timezone.now()
+        update_trending(now)
+        # Событие со временем до пересчёта стало видно только после него
+        self.favorite(now - timedelta(seconds=10))
+        update_trending(now + timedelta(seconds=60))
+        self.assertAlmostEqual(self.score(), 1.0, places=2)
+        update_trending(now + timedelta(seconds=120))
+        self.assertAlmostEqual(self.score(), 1.0, places=2)
@@ -3,7 +3,26 @@ from django.db import models
 from django.db.models import UniqueConstraint
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """Не перезаписывает счётчики при сохранении загруженной записи.
+
+    Счётчики меняются только атомарными UPDATE с F(), поэтому значение
+    в памяти может быть устаревшим.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """Модель пользователя"""
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
@@ -16,6 +35,18 @@ class User(AbstractUser):
         max_length=254,
         unique=True
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    counter_fields = ('recipes_count', 'subscribers_count')
 
     class Meta:
         ordering = ['-id']
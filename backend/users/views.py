@@ -1,14 +1,20 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import BooleanField, OuterRef, Prefetch, Subquery, Value
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from .models import Subscribe
+from api.pagination import UsersPagination
 from api.serializers import SubscribeSerializer, UserSerializer
+from core.counters import increment
+from core.db import delete_returning, insert_ignore
+from core.models import Recipe
 
 User = get_user_model()
 
@@ -16,7 +22,7 @@ User = get_user_model()
 class UsersViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = UsersPagination
 
     @action(
         detail=True,
@@ -33,13 +39,25 @@ class UsersViewSet(UserViewSet):
                                              data=request.data,
                                              context={'request': request})
             serializer.is_valid(raise_exception=True)
-            Subscribe.objects.create(user=user, author=author)
+            with transaction.atomic():
+                if not insert_ignore(Subscribe, user=user, author=author):
+                    return Response('Вы уже подписаны на этого пользователя',
+                                    status=status.HTTP_400_BAD_REQUEST)
+                increment(User.objects.filter(pk=author.pk),
+                          'subscribers_count')
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        subscription = get_object_or_404(Subscribe,
-                                         user=user,
-                                         author=author)
-        subscription.delete()
+        with transaction.atomic():
+            # Один DELETE ... RETURNING: из параллельных запросов строку
+            # удалит и уменьшит счётчик только один. Сигнал post_delete
+            # при этом не отправляется, счётчик меняется здесь
+            deleted = delete_returning(
+                Subscribe.objects.filter(user=user, author=author), 'author'
+            )
+            if not deleted:
+                raise Http404
+            increment(User.objects.filter(pk=author.pk),
+                      'subscribers_count', -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -48,7 +66,18 @@ class UsersViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        recipes = Recipe.objects.all()
+        limit = request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            # Первые recipes_limit рецептов каждого автора одним запросом
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:int(limit)]
+            ))
+        queryset = User.objects.filter(subscribing__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).prefetch_related(Prefetch('recipes', queryset=recipes))
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(pages,
                                          many=True,